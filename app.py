@@ -1,18 +1,167 @@
 
+import calendar
+import os
+import queue
+import re
 import sqlite3
-from typing import Final, Optional, Union
-import unicodedata
-from datetime import datetime, timedelta 
-from flask import Flask, g, redirect, render_template, request, url_for, flash
+import time
+from typing import Any, Final, Iterator, Optional, Union
+from datetime import date
+from flask import Flask, g, redirect, render_template, request, url_for, flash, stream_template, jsonify
 from werkzeug import Response
 
 # データベースのファイル名
 DATABASE: Final[str] = 'fun.db'
 
+# 使い回すデータベース接続の最大数
+POOL_SIZE: Final[int] = 8
+
+# リクエスト間で使い回すデータベース接続のプール
+_pool: 'queue.Queue[sqlite3.Connection]' = queue.Queue(maxsize=POOL_SIZE)
+
+# 接続ごとに一度だけ設定する SQLite の PRAGMA
+PRAGMAS: Final[tuple[str, ...]] = (
+    'PRAGMA journal_mode=WAL',      # 読み込みが書き込みにブロックされないようにする
+    'PRAGMA synchronous=NORMAL',    # WAL ではコミットごとの fsync を省ける
+    'PRAGMA cache_size=-65536',     # ページキャッシュを 64MiB にする
+    'PRAGMA mmap_size=268435456',   # 256MiB までメモリマップで読む
+    'PRAGMA temp_store=MEMORY',     # 一時テーブルやソートをメモリ上で行う
+)
+
+# 起動時に作成するインデックス
+INDEXES: Final[tuple[str, ...]] = (
+    # 会員資格の期間重複チェック
+    'CREATE INDEX IF NOT EXISTS ix_sub_cust_group '
+    'ON Subscription(customer_id, group_id, start_date, end_date)',
+    # アーティストごとのイベント一覧
+    'CREATE INDEX IF NOT EXISTS ix_event_group ON Event(group_id, type_id)',
+    # イベントタイプ名による絞り込み
+    'CREATE INDEX IF NOT EXISTS ix_et_typename ON EventType(type_name)',
+    # 入会時の名前による検索
+    'CREATE UNIQUE INDEX IF NOT EXISTS ix_artist_name ON Artist(name)',
+    'CREATE UNIQUE INDEX IF NOT EXISTS ix_course_name '
+    'ON SubscriptionCourse(course_name)',
+)
+
+# 起動時にコンパイルしておくテンプレート
+TEMPLATES: Final[tuple[str, ...]] = (
+    'index.html', 'artists.html', 'artist.html', 'events.html',
+    'login.html', 'customer.html', 'customer-add.html',
+    'customer-edit.html', 'customer-del.html', 'join-funclub.html',
+)
+
+# 一覧表示用のキャッシュの有効期間（秒）
+LIST_CACHE_TTL: Final[float] = 60.0
+
+# めったに変わらない一覧のキャッシュ（SQL 文のキー -> (有効期限, 行のタプル)）
+_list_cache: dict[str, tuple[float, tuple[dict[str, Any], ...]]] = {}
+
+# 制御文字（Unicode の一般カテゴリ Cc）にマッチする正規表現
+_CC_RE: Final[re.Pattern[str]] = re.compile(r'[\x00-\x1f\x7f-\x9f]')
+
+# 接続ごとの文キャッシュの大きさ
+CACHED_STATEMENTS: Final[int] = 128
+
+# ビューで使う SQL 文
+# 同じ文字列オブジェクトを使い回し、sqlite3 の文キャッシュに必ず当たるようにする
+STATEMENTS: Final[dict[str, str]] = {
+    'list_artists': 'SELECT id,name,debut_year FROM Artist',
+    'get_artist': 'SELECT * FROM Artist WHERE id = ?',
+    'list_event_types': 'SELECT type_name FROM EventType',
+    'list_artist_events': '''
+        SELECT e.name AS event_name
+        FROM Event e
+        LEFT JOIN EventType et ON e.type_id = et.id
+        WHERE e.group_id = ? AND (? = '' OR et.type_name = ?)
+    ''',
+    'get_customer': 'SELECT * FROM Customer WHERE id = ?',
+    'customer_exists':
+        'SELECT EXISTS(SELECT 1 FROM Customer WHERE id = ?)',
+    'insert_customer': ('INSERT INTO Customer '
+                        '(id, name, email, phone, address) '
+                        'VALUES (?, ?, ?, ?, ?) '
+                        'ON CONFLICT(id) DO NOTHING RETURNING id'),
+    'update_customer': ('UPDATE Customer '
+                        'SET name = ?, email = ?, '
+                        'phone = ?, address = ? '
+                        'WHERE id = ?'),
+    'list_customer_subscriptions': '''
+        SELECT
+            s.id AS subscription_id,
+            a.name AS artist_name,
+            sc.course_name,
+            s.start_date,
+            s.end_date
+        FROM
+            Subscription s
+            JOIN Artist a ON s.group_id = a.id
+            JOIN SubscriptionCourse sc ON s.course_id = sc.id
+        WHERE
+            s.customer_id = ?
+    ''',
+    'list_customer_events': '''
+        SELECT
+            ep.subscription_id AS subscription_id,
+            e.name AS event_name,
+            et.type_name AS type_name,
+            ep.participation_date AS participation_date
+        FROM
+            EventParticipation ep
+            JOIN Subscription s ON ep.subscription_id = s.id
+            JOIN Event e ON ep.event_id = e.id
+            JOIN EventType et ON e.type_id = et.id
+        WHERE
+            s.customer_id = ?
+    ''',
+    'list_courses': 'SELECT *  FROM SubscriptionCourse',
+    'get_subscription': 'SELECT *  FROM Subscription WHERE id = ?',
+    'get_subscription_owner': ('SELECT id AS subscription_id ,'
+                               'customer_id AS customer_id '
+                               'FROM Subscription WHERE id = ?'),
+    'get_artist_and_course': (
+        'SELECT a.id AS artist_id, sc.id AS course_id, sc.duration_months '
+        'FROM Artist a, SubscriptionCourse sc '
+        'WHERE a.name = ? AND sc.course_name = ?'),
+    'find_subscription_conflict': '''
+        SELECT
+            EXISTS(SELECT 1 FROM Subscription WHERE id = ?) AS subscriber,
+            EXISTS(SELECT 1 FROM Subscription
+                   WHERE customer_id = ? AND group_id = ?
+                     AND start_date < ? AND end_date > ?) AS is_double
+    ''',
+    'insert_subscription': ('INSERT INTO Subscription '
+                            '(id,customer_id, group_id, course_id, start_date, end_date) '
+                            'VALUES (?,?, ?, ?, ?, ?)'),
+    'delete_subscription': 'DELETE FROM Subscription WHERE id = ?',
+}
+
 # Flask クラスのインスタンス
 app = Flask(__name__)
 app.secret_key = b'_5#y2L"F4Q8z\n\xec]/'
 
+def _connect() -> sqlite3.Connection:
+    """
+    プールに入れる新しいデータベース接続を作る.
+
+    スレッドをまたいで使い回せるように check_same_thread を無効にし、
+    自動コミットモード（isolation_level=None）で接続する。
+    カラム名でフィールドにアクセスできるように設定変更し、
+    PRAGMAS の各設定を一度だけ実行する。
+    STATEMENTS の SQL 文はこの接続の文キャッシュでコンパイル済みのまま使い回される。
+    接続はプールで使い回すので設定はその後も保たれる。
+
+    Returns:
+      sqlite3.Connection: データベース接続
+    """
+    db = sqlite3.connect(DATABASE, check_same_thread=False,
+                         isolation_level=None,
+                         cached_statements=CACHED_STATEMENTS)
+    db.row_factory = sqlite3.Row  # カラム名でアクセスできるよう設定変更
+    for pragma in PRAGMAS:
+        db.execute(pragma)
+    return db
+
+
 def get_db() -> sqlite3.Connection:
     """
     データベース接続を得る.
@@ -20,43 +169,188 @@ def get_db() -> sqlite3.Connection:
     リクエスト処理中にデータベース接続が必要になったら呼ぶ関数。
 
     Flask の g にデータベース接続が保存されていたらその接続を返す。
-    そうでなければデータベース接続して g に保存しつつ接続を返す。
-    その際に、カラム名でフィールドにアクセスできるように設定変更する。
+    そうでなければプールから接続を借りて g に保存しつつ接続を返す。
+    プールが空のときは新しく接続する。
 
     https://flask.palletsprojects.com/en/3.0.x/patterns/sqlite3/
-    のサンプルにある関数を流用し設定変更を追加。
+    のサンプルにある関数を流用し、接続をプールから借りるよう変更。
 
     Returns:
-      sqlite3.connect: データベース接続
+      sqlite3.Connection: データベース接続
     """
     db = getattr(g, '_database', None)
     if db is None:
-        db = g._database = sqlite3.connect(DATABASE)
-        db.row_factory = sqlite3.Row  # カラム名でアクセスできるよう設定変更
+        try:
+            db = _pool.get_nowait()
+        except queue.Empty:
+            db = _connect()
+        g._database = db
     return db
 
 
 @app.teardown_appcontext
 def close_connection(exception: Optional[BaseException]) -> None:
     """
-    データベース接続を閉じる.
+    データベース接続をプールへ返す.
 
     リクエスト処理の終了時に Flask が自動的に呼ぶ関数。
 
-    Flask の g にデータベース接続が保存されていたら閉じる。
+    Flask の g にデータベース接続が保存されていたらプールへ返す。
+    プールが満杯のときだけ接続を閉じる。
 
     https://flask.palletsprojects.com/en/3.0.x/patterns/sqlite3/
-    のサンプルにある関数をそのまま流用。
+    のサンプルにある関数を流用し、接続を閉じずにプールへ返すよう変更。
 
     Args:
       exception (Optional[BaseException]): 未処理の例外
     """
     db = getattr(g, '_database', None)
     if db is not None:
-        db.close()
-        
+        if db.in_transaction:
+            db.rollback()  # 途中のトランザクションを次のリクエストへ持ち越さない
+        try:
+            _pool.put_nowait(db)
+        except queue.Full:
+            db.close()
+
+
+def init_db() -> None:
+    """
+    データベースのインデックスを準備する.
+
+    アプリケーションの起動時に一度だけ呼ぶ関数。
+
+    INDEXES のインデックスがなければ作成する。
+    使った接続はそのままプールへ入れておく。
+    """
+    db = _connect()
+    for index in INDEXES:
+        db.execute(index)
+    _pool.put_nowait(db)
+
+
+init_db()
+
+
+def warm_templates() -> None:
+    """
+    テンプレートをあらかじめコンパイルしておく.
+
+    TEMPLATES の各テンプレートを Jinja の環境に読み込ませ、
+    最初のリクエストでコンパイルを待たずに済むようにする。
+    """
+    for template in TEMPLATES:
+        app.jinja_env.get_template(template)
+
+
+# CGI ではリクエストごとにプロセスが起動するので、使わないテンプレートまで
+# コンパイルすると遅くなる。常駐するサーバで動くときだけ温めておく。
+if 'GATEWAY_INTERFACE' not in os.environ:
+    warm_templates()
+
+
+def _fetch_dicts(cur: sqlite3.Cursor) -> list[dict[str, Any]]:
+    """
+    実行済みカーソルの残りの行を dict のリストにして得る.
+
+    カラム名は cur.description から一度だけ取り出す。
+    テンプレートのループで行を何度も参照するときに使う。
+
+    Args:
+      cur (sqlite3.Cursor): execute 済みのカーソル
+    Returns:
+      list[dict[str, Any]]: 各行
+    """
+    cols = [c[0] for c in cur.description]
+    return [dict(zip(cols, row)) for row in cur]
 
-        
+
+def _cached_list(key: str) -> tuple[dict[str, Any], ...]:
+    """
+    めったに変わらない一覧をキャッシュを通して得る.
+
+    STATEMENTS[key] の結果を LIST_CACHE_TTL 秒の間キャッシュする。
+    行は接続に依存しないよう dict に変換して保持する。
+
+    Args:
+      key (str): STATEMENTS のキー
+    Returns:
+      tuple[dict[str, Any], ...]: 一覧の各行
+    """
+    now = time.monotonic()
+    cached = _list_cache.get(key)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    rows = tuple(_fetch_dicts(get_db().execute(STATEMENTS[key])))
+    _list_cache[key] = (now + LIST_CACHE_TTL, rows)
+    return rows
+
+
+def _all_artists() -> tuple[dict[str, Any], ...]:
+    """
+    全アーティストの一覧を得る.
+
+    Returns:
+      tuple[dict[str, Any], ...]: id, name, debut_year を持つ各行
+    """
+    return _cached_list('list_artists')
+
+
+def _all_event_types() -> tuple[dict[str, Any], ...]:
+    """
+    全イベントタイプの一覧を得る.
+
+    Returns:
+      tuple[dict[str, Any], ...]: type_name を持つ各行
+    """
+    return _cached_list('list_event_types')
+
+
+def _all_courses() -> tuple[dict[str, Any], ...]:
+    """
+    全コースの一覧を得る.
+
+    Returns:
+      tuple[dict[str, Any], ...]: SubscriptionCourse の全カラムを持つ各行
+    """
+    return _cached_list('list_courses')
+
+
+def _json_list(rows: tuple[dict[str, Any], ...]) -> Response:
+    """
+    一覧を JSON で返すレスポンスを作る.
+
+    内容から ETag を付け、ブラウザの持つ ETag と一致すれば
+    本文なしの 304 を返す。
+
+    Args:
+      rows (tuple[dict[str, Any], ...]): 一覧の各行
+    Returns:
+      Response: JSON のレスポンス
+    """
+    response = jsonify(rows)
+    response.add_etag()
+    return response.make_conditional(request)
+
+
+def add_months(d: date, months: int) -> date:
+    """
+    日付に月数を足す.
+
+    足した先の月に同じ日がなければその月の末日にする
+    （dateutil.relativedelta と同じ扱い）。
+
+    Args:
+      d (date): 元の日付
+      months (int): 足す月数
+    Returns:
+      date: months か月後の日付
+    """
+    year, month = divmod(d.month - 1 + months, 12)
+    year += d.year
+    month += 1
+    day = min(d.day, calendar.monthrange(year, month)[1])
+    return d.replace(year=year, month=month, day=day)
 
 
 def has_control_character(s: str) -> bool:
@@ -68,7 +362,7 @@ def has_control_character(s: str) -> bool:
     Returns:
       bool: 含まれていれば True 含まれていなければ False
     """
-    return any(map(lambda c: unicodedata.category(c) == 'Cc', s))
+    return _CC_RE.search(s) is not None
 
 
 @app.route('/')
@@ -90,24 +384,55 @@ def index() -> str:
 
 
 @app.route('/artists')
-def artists() -> str:
+def artists() -> Iterator[str]:
     """
     artist一覧のページ（全員）.
 
+    ページ全体を文字列に組み立てず、テンプレートの出力を少しずつ返す。
+
     Returns:
-      str: ページのコンテンツ
+      Iterator[str]: ページのコンテンツ
     """
-    # データベース接続してカーソルを得る
-    cur = get_db().cursor()
+    # 一覧はキャッシュから得る
+    a_list = _all_artists()
 
-    
-    a_list = cur.execute('SELECT id,name,debut_year FROM Artist').fetchall()
+    # 一覧をテンプレートへ渡してレンダリングしながら返す
+    return stream_template('artists.html', a_list=a_list)
+
+@app.route('/api/artists')
+def api_artists() -> Response:
+    """
+    artist一覧（JSON）.
+
+    Returns:
+      Response: id, name, debut_year を持つ各行の JSON
+    """
+    return _json_list(_all_artists())
 
-    # 一覧をテンプレートへ渡してレンダリングしたものを返す
-    return render_template('artists.html', a_list=a_list)
 
-@app.route('/artists/<id>')
-def artist(id: str) -> str:
+@app.route('/api/event-types')
+def api_event_types() -> Response:
+    """
+    イベントタイプ一覧（JSON）.
+
+    Returns:
+      Response: type_name を持つ各行の JSON
+    """
+    return _json_list(_all_event_types())
+
+
+@app.route('/api/courses')
+def api_courses() -> Response:
+    """
+    コース一覧（JSON）.
+
+    Returns:
+      Response: SubscriptionCourse の全カラムを持つ各行の JSON
+    """
+    return _json_list(_all_courses())
+
+@app.route('/artists/<int:id>')
+def artist(id: int) -> str:
     """
     artist詳細ページ.
     Returns:
@@ -117,82 +442,37 @@ def artist(id: str) -> str:
     con = get_db()
     cur = con.cursor()
 
-    try:
-        # 文字列型で渡された社員番号を整数型へ変換する
-        id_num = int(id)
-    except ValueError:
-       
-        return render_template('artist-not-found.html')
-
     
-    artist = cur.execute('SELECT * FROM Artist WHERE id = ?',
-                           (id_num,)).fetchone()
+    artist = cur.execute(STATEMENTS['get_artist'],
+                         (id,)).fetchone()
 
    
     return render_template('artist.html', artist = artist)
 
-@app.route('/events/<id>')
-def events(id: str) -> str:
+@app.route('/events/<int:id>', methods=['GET', 'POST'])
+def events(id: int) -> str:
     """
-    Show events for a specific artist.
+    Show events for a specific artist, optionally filtered by event type.
     """
     con = get_db()
     cur = con.cursor()
 
-    try:
-        id_num = int(id)
-    except ValueError:
-        return render_template('artist-not-found.html')
-
     # Fetch artist details
-    artist = cur.execute('SELECT * FROM Artist WHERE id = ?', (id_num,)).fetchone()
+    artist = cur.execute(STATEMENTS['get_artist'], (id,)).fetchone()
     if artist is None:
         return render_template('artist-not-found.html')
 
     # Fetch all event types for dropdown
-    event_list = cur.execute('SELECT type_name FROM EventType').fetchall()
-
-    # Fetch all events associated with the artist
-    e_list = cur.execute('SELECT e.name AS event_name FROM Event e WHERE e.group_id = ?', (id_num,)).fetchall()
+    event_list = _all_event_types()
 
-    return render_template('events.html', id=id_num, event_list=event_list, e_list=e_list)
-
-@app.route('/events/<id>', methods=['POST'])
-def events_filtered(id: str) -> str:
-    """
-    Show events filtered by event type for a specific artist.
-    """
-    con = get_db()
-    cur = con.cursor()
-
-    try:
-        id_num = int(id)
-    except ValueError:
-        return render_template('artist-not-found.html')
-
-    artist = cur.execute('SELECT * FROM Artist WHERE id = ?', (id_num,)).fetchone()
-    if artist is None:
-        return render_template('artist-not-found.html')
-
-    # Fetch all event types for dropdown
-    event_list = cur.execute('SELECT type_name FROM EventType').fetchall()
-
-    # Get selected event type from form
+    # Get selected event type from form (empty means all events)
     event_type = request.form.get('event_type', '')
 
-    if event_type:
-        # Fetch events filtered by event type
-        e_list = cur.execute('''
-            SELECT e.name AS event_name
-            FROM Event e
-            JOIN EventType et ON e.type_id = et.id
-            WHERE e.group_id = ? AND et.type_name = ?
-        ''', (id_num, event_type)).fetchall()
-    else:
-        # If no event type is selected, show all events
-        e_list = cur.execute('SELECT e.name AS event_name FROM Event e WHERE e.group_id = ?', (id_num,)).fetchall()
+    # Fetch events associated with the artist
+    e_list = cur.execute(STATEMENTS['list_artist_events'],
+                         (id, event_type, event_type)).fetchall()
 
-    return render_template('events.html', id=id_num, event_list=event_list, e_list=e_list)
+    return render_template('events.html', id=id, event_list=event_list, e_list=e_list)
 
 
 
@@ -211,12 +491,12 @@ def login() -> str:
        member_id = request.form['id_filter']
        phone_number = request.form['phone_filter']
 
-       customer = cur.execute('SELECT * FROM Customer WHERE id = ?',
+       customer = cur.execute(STATEMENTS['get_customer'],
                               (member_id,)).fetchone()
 
        if customer and customer['phone'] == phone_number:
         
-           return redirect(url_for('customer', id=member_id))
+           return redirect(url_for('customer', id=customer['id']))
        else:
             flash('ユーザーIDまたは電話番号が間違っています。')
             return redirect(url_for('login'))
@@ -231,60 +511,34 @@ def logout():
 
     return redirect(url_for('index'))
 
-@app.route('/customer/<id>')
-def customer(id: str) -> str:
+@app.route('/customer/<int:id>')
+def customer(id: int) -> str:
     
     # データベース接続してカーソルを得る
     con = get_db()
     cur = con.cursor()
-    id_num = int(id)
     
     # Fetch customer details
-    customer = cur.execute('SELECT * FROM Customer WHERE id = ?', (id_num,)).fetchone()
-    cnt = cur.execute('''
-        SELECT COUNT(s.id) AS subscription_count
-        FROM
-            Subscription s
-        WHERE
-            s.customer_id = ?
-    ''', (id_num,)).fetchone()[0]
+    customer = cur.execute(STATEMENTS['get_customer'], (id,)).fetchone()
     # Fetch subscriptions of the customer
-    s_list = cur.execute('''
-        SELECT
-            s.id AS subscription_id,
-            a.name AS artist_name,
-            sc.course_name,
-            s.start_date,
-            s.end_date
-        FROM
-            Subscription s
-            JOIN Artist a ON s.group_id = a.id
-            JOIN SubscriptionCourse sc ON s.course_id = sc.id
-        WHERE
-            s.customer_id = ?
-    ''', (id_num,)).fetchall()
+    s_list = _fetch_dicts(cur.execute(STATEMENTS['list_customer_subscriptions'],
+                                      (id,)))
+    cnt = len(s_list)
 
     # Dictionary to store events for each subscription
     e_dict = {}
-    
-    # Fetch events for each subscription
-    for subscription in s_list:
-        subscription_id = subscription['subscription_id']
-        events = cur.execute('''
-            SELECT
-                e.name AS event_name,
-                et.type_name AS type_name,
-                ep.participation_date AS participation_date
-            FROM
-                EventParticipation ep
-                JOIN Event e ON ep.event_id = e.id
-                JOIN EventType et ON e.type_id = et.id
-            WHERE
-                ep.subscription_id = ?
-        ''', (subscription_id,)).fetchall()
-        e_dict[subscription_id] = events
-
-    return render_template('customer.html', customer=customer, s_list=s_list, e_dict=e_dict, cnt = cnt)
+
+    # Fetch events of all subscriptions at once and bucket them by subscription
+    events = _fetch_dicts(cur.execute(STATEMENTS['list_customer_events'],
+                                      (id,)))
+    for event in events:
+        e_dict.setdefault(event['subscription_id'], []).append(event)
+
+    # Pair each subscription with its events for the template
+    rendered = [(subscription, e_dict.get(subscription['subscription_id'], ()))
+                for subscription in s_list]
+
+    return render_template('customer.html', customer=customer, rendered=rendered, cnt = cnt)
    
 
 
@@ -340,12 +594,6 @@ def customer_add_execute() -> Response:
     if id <= 0:
         flash('実行に失敗しました。無効なIDが指定されました。')
         return redirect(url_for('customer_add'))
-    customer = cur.execute('SELECT id FROM Customer WHERE id = ?',
-                           (id,)).fetchone()
-    if customer is not None:
-        flash('実行に失敗しました。すでに既存のIDが指定されました。')
-        return redirect(url_for('customer_add'))
-    
     if has_control_character(name):
         flash('実行に失敗しました。名前に使えない文字があります。')
         return redirect(url_for('customer_add'))
@@ -363,16 +611,16 @@ def customer_add_execute() -> Response:
     
    
     try:
-        cur.execute('INSERT INTO Customer '
-                    '(id, name, email, phone, address) '
-                    'VALUES (?, ?, ?, ?, ?)',
-                    (id, name, email, phone, address))
+        # 既存の ID なら挿入せず None が返る
+        inserted = cur.execute(STATEMENTS['insert_customer'],
+                               (id, name, email, phone, address)).fetchone()
     except sqlite3.Error:
         flash('データベースエラー')
         return redirect(url_for('customer_add'))
+    if inserted is None:
+        flash('実行に失敗しました。すでに既存のIDが指定されました。')
+        return redirect(url_for('customer_add'))
     
-   
-    con.commit()
     
     # 社員追加完了
     return redirect(url_for('customer', id=id))
@@ -381,8 +629,8 @@ def customer_add_execute() -> Response:
 
 
 
-@app.route('/customer-edit/<id>')
-def customer_edit(id: str) -> str:
+@app.route('/customer-edit/<int:id>')
+def customer_edit(id: int) -> str:
     """
     会員情報編集ページ.
     Returns:
@@ -393,24 +641,19 @@ def customer_edit(id: str) -> str:
     con = get_db()
     cur = con.cursor()
    
-    try:
-        id_num = int(id)
-    except ValueError:
-        flash('実行に失敗しました。無効なIDが指定されました。')
-        return redirect(url_for('customer_edit', id = id))
     
-    customer = cur.execute('SELECT * FROM Customer WHERE id = ?',
-                           (id_num,)).fetchone()
+    customer = cur.execute(STATEMENTS['get_customer'],
+                           (id,)).fetchone()
     if customer is None:
         flash('実行に失敗しました。会員情報が見つかりません。')
-        return redirect(url_for('customer_edit', id = id_num))
+        return redirect(url_for('customer_edit', id = id))
 
    
     return render_template('customer-edit.html', id = id, customer = customer)
 
 
-@app.route('/customer-edit/<id>', methods=['POST'])
-def customer_edit_update(id: str) -> Response:
+@app.route('/customer-edit/<int:id>', methods=['POST'])
+def customer_edit_update(id: int) -> Response:
     """
     会員編集更新.
 
@@ -421,17 +664,6 @@ def customer_edit_update(id: str) -> Response:
     con = get_db()
     cur = con.cursor()
 
-    try:
-        id_num = int(id)
-    except ValueError:
-        flash('実行に失敗しました。無効なIDが指定されました。')
-        return redirect(url_for('customer-edit', id = id_num))
-    
-    customer = cur.execute('SELECT * FROM Customer WHERE id = ?',
-                           (id_num,)).fetchone()
-    if customer is None:
-        flash('実行に失敗しました。会員情報が見つかりません。')
-        return redirect(url_for('customer_edit', id = id_num))
     
     name = request.form['name']
     address = request.form['address']
@@ -440,116 +672,115 @@ def customer_edit_update(id: str) -> Response:
    
     if has_control_character(name):
         flash('実行に失敗しました。名前に使えない文字があります。')
-        return redirect(url_for('customer_edit', id = id_num))
+        return redirect(url_for('customer_edit', id = id))
     
     if has_control_character(email):
         flash('実行に失敗しました。メールアドレスに使えない文字があります。')
-        return redirect(url_for('customer_edit', id = id_num))
+        return redirect(url_for('customer_edit', id = id))
     
     
     if has_control_character(address):
         flash('実行に失敗しました。住所に使えない文字があります。')
-        return redirect(url_for('customer_edit', id = id_num))
+        return redirect(url_for('customer_edit', id = id))
     
         
     try:
-
-        cur.execute('UPDATE Customer '
-                    'SET name = ?, email = ?, '
-                    'phone = ?, address = ? '
-                    'WHERE id = ?',
-                    (name, email, phone, address, id_num))
-        con.commit()
+        # 存在確認と更新を一つのトランザクションで行う
+        with con:
+            con.execute('BEGIN IMMEDIATE')
+            exists = cur.execute(STATEMENTS['customer_exists'],
+                                 (id,)).fetchone()[0]
+            if not exists:
+                flash('実行に失敗しました。会員情報が見つかりません。')
+                return redirect(url_for('customer_edit', id = id))
+            cur.execute(STATEMENTS['update_customer'],
+                        (name, email, phone, address, id))
     except sqlite3.Error:
         flash('実行に失敗しました。')
-        return redirect(url_for('customer_edit', id = id_num))
+        return redirect(url_for('customer_edit', id = id))
 
 
     flash('会員情報が編集されました！')
-    return redirect(url_for('customer',id = id_num))
+    return redirect(url_for('customer',id = id))
 
-@app.route('/join-funclub/<id>')
-def join_funclub(id: str) -> str:
+@app.route('/join-funclub/<int:id>')
+def join_funclub(id: int) -> str:
     """
     Show events for a specific artist.
     """
     
-    con = get_db()
-    cur = con.cursor()
   
-    
-    id_num = int(id)
-  
-    artist_list = cur.execute('SELECT name FROM Artist').fetchall()
-    course_list = cur.execute('SELECT *  FROM SubscriptionCourse').fetchall()
+    artist_list = _all_artists()
+    course_list = _all_courses()
    
-    return render_template('join-funclub.html', id=id_num, artist_list = artist_list, course_list = course_list)
+    return render_template('join-funclub.html', id=id, artist_list = artist_list, course_list = course_list)
 
-@app.route('/join-funclub/<id>', methods=['POST'])
-def join_funclub_execute(id: str) -> str:
+@app.route('/join-funclub/<int:id>', methods=['POST'])
+def join_funclub_execute(id: int) -> str:
     """
     Show events filtered by event type for a specific artist.
     """
     con = get_db()
     cur = con.cursor()
     
-    id_num = int(id)
   
-    artist_list = cur.execute('SELECT name FROM Artist').fetchall()
-    course_list = cur.execute('SELECT *  FROM SubscriptionCourse').fetchall()
     try:
         subscription_id = int(request.form.get('id',''))
     except ValueError:
         flash('実行に失敗しました。無効なIDが指定されました。')
-        return redirect(url_for('join_funclub',id = id_num))
+        return redirect(url_for('join_funclub',id = id))
     if subscription_id <= 0:
         flash('実行に失敗しました。無効なIDが指定されました。')
-        return redirect(url_for('join_funclub',id = id_num))
-    subscriber = cur.execute('SELECT id  FROM Subscription WHERE id = ?', (subscription_id,)).fetchone()
-    if subscriber is not None:
-        flash('実行に失敗しました。すでに既存のIDが指定されました。')
-        return redirect(url_for('join_funclub',id = id_num))
-    
+        return redirect(url_for('join_funclub',id = id))
     artist_name = request.form.get('artist', '')
     course_name = request.form.get('course', '')
     start_date_str = request.form.get('start_date', '')
     
    
     try:
-        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+        start_date = date.fromisoformat(start_date_str)
     except ValueError:
         flash('日付の形式が正しくありません。YYYY-MM-DDの形式で入力してください。')
-        return redirect(url_for('join_funclub', id=id_num))
-    
-    
-    duration_month = int(cur.execute('SELECT duration_months FROM SubscriptionCourse WHERE course_name = ?', (course_name,)).fetchone()['duration_months'])
-    end_date = start_date + timedelta(days=duration_month * 30)
+        return redirect(url_for('join_funclub', id=id))
     
-      
-    artist_id = cur.execute('SELECT id FROM Artist WHERE name = ?', (artist_name,)).fetchone()['id']
-    
-    course_id = cur.execute('SELECT id FROM SubscriptionCourse WHERE course_name = ?', (course_name,)).fetchone()['id']
-    
-    is_double = cur.execute('SELECT id  FROM Subscription WHERE customer_id = ? and group_id = ? and start_date < ? and end_date > ? ', (id_num,artist_id,end_date,start_date)).fetchone()
-    if is_double:
-       flash('実行に失敗しました。すでに同じ期間中に会員資格が存在します。')
-       return redirect(url_for('join_funclub', id=id_num))
-   
     try:
-        cur.execute('INSERT INTO Subscription '
-                    '(id,customer_id, group_id, course_id, start_date, end_date) '
-                    'VALUES (?,?, ?, ?, ?, ?)',
-                    (subscription_id,id_num, artist_id, course_id, start_date, end_date))
-        con.commit()
+        # 参照、重複チェック、追加を一つのトランザクションで行う
+        with con:
+            con.execute('BEGIN IMMEDIATE')
+
+            # アーティストとコースをまとめて引く
+            selected = cur.execute(STATEMENTS['get_artist_and_course'],
+                                   (artist_name, course_name)).fetchone()
+            if selected is None:
+                flash('実行に失敗しました。アーティストまたはコースが見つかりません。')
+                return redirect(url_for('join_funclub', id=id))
+            artist_id = selected['artist_id']
+            course_id = selected['course_id']
+            duration_month = int(selected['duration_months'])
+            end_date = add_months(start_date, duration_month)
+
+            # ID の重複と期間の重複をまとめて調べる
+            conflict = cur.execute(STATEMENTS['find_subscription_conflict'],
+                                   (subscription_id, id, artist_id,
+                                    end_date, start_date)).fetchone()
+            if conflict['subscriber']:
+                flash('実行に失敗しました。すでに既存のIDが指定されました。')
+                return redirect(url_for('join_funclub',id = id))
+            if conflict['is_double']:
+                flash('実行に失敗しました。すでに同じ期間中に会員資格が存在します。')
+                return redirect(url_for('join_funclub', id=id))
+
+            cur.execute(STATEMENTS['insert_subscription'],
+                        (subscription_id,id, artist_id, course_id, start_date, end_date))
     except sqlite3.Error:
         flash('データベースエラー')
-        return redirect(url_for('join_funclub', id=id_num))
+        return redirect(url_for('join_funclub', id=id))
     
     flash('Fun Clubに参加しました！')
-    return redirect(url_for('customer', id=id_num))
+    return redirect(url_for('customer', id=id))
 
-@app.route('/customer-del/<id>')
-def customer_del(id: str) -> str:
+@app.route('/customer-del/<int:id>')
+def customer_del(id: int) -> str:
     """
     退会確認ページ.
 
@@ -558,14 +789,13 @@ def customer_del(id: str) -> str:
     """
     con = get_db()
     cur = con.cursor()
-    id_num = int(id)
     
-    subscribers = cur.execute('SELECT id AS subscription_id ,customer_id AS customer_id FROM Subscription WHERE id = ?', (id_num,)).fetchall()
-    return render_template('customer-del.html', id=id_num, customer_id = subscribers[0]['customer_id'])
+    subscribers = cur.execute(STATEMENTS['get_subscription_owner'], (id,)).fetchall()
+    return render_template('customer-del.html', id=id, customer_id = subscribers[0]['customer_id'])
 
 
-@app.route('/customer-del/<id>', methods=['POST'])
-def customer_del_execute(id: str) -> Response:
+@app.route('/customer-del/<int:id>', methods=['POST'])
+def customer_del_execute(id: int) -> Response:
     """
     退会実行.
 
@@ -576,25 +806,21 @@ def customer_del_execute(id: str) -> Response:
     con = get_db()
     cur = con.cursor()
 
-    try:
-        id_num = int(id)
-    except ValueError:
-        flash('実行に失敗しました。無効なIDが指定されました。')
-        return redirect(url_for('customer_del', id = id))
    
-    customer = cur.execute('SELECT *  FROM Subscription WHERE id = ?',
-                           (id_num,)).fetchone()
-    if customer is None:
-        flash('実行に失敗しました。会員情報が見つかりません。')
-        return redirect(url_for('customer_del', id = id_num))
-
     try:
-        cur.execute('DELETE FROM Subscription WHERE id = ?', (id_num,))
+        # 確認と削除を一つのトランザクションで行う
+        with con:
+            con.execute('BEGIN IMMEDIATE')
+            customer = cur.execute(STATEMENTS['get_subscription'],
+                                   (id,)).fetchone()
+            if customer is None:
+                flash('実行に失敗しました。会員情報が見つかりません。')
+                return redirect(url_for('customer_del', id = id))
+            cur.execute(STATEMENTS['delete_subscription'], (id,))
     except sqlite3.Error:
         flash('退会に失敗しました。')
-        return redirect(url_for('customer_del', id = id_num))
+        return redirect(url_for('customer_del', id = id))
     
-    con.commit()
     flash('退会が完了しました')
     return redirect(url_for('customer',id = customer['customer_id']))
 